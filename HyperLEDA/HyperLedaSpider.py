@@ -6,21 +6,172 @@
     HyperLedaSpider: Get galaxy information from HyperLEDA database
 '''
 
-import os, sys, re, six, requests
+import os, sys, io, re, requests, asyncio, functools
 import urllib.parse as ps
-from bs4 import BeautifulSoup
+from itertools import groupby
+from operator import methodcaller
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import html, etree
+
+try: import aiohttp
+except ImportError: aiohttp = None # only needed by query_many
+
+try: from selectolax.lexbor import LexborHTMLParser as _FastHTMLParser
+except ImportError: _FastHTMLParser = None # fall back to lxml
+
+try: import requests_cache
+except ImportError: requests_cache = None # on-disk cache is optional
 
 from astropy.io import votable
 import astropy.coordinates as coord
 import astropy.units as u
 import numpy as np
 
+# value/error separator in the data table
+_PM = u'\u00b1'
+
+# plain decimal numbers, tested before calling float()
+_NUMERIC_RE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+
+# shared HTML parser: takes raw bytes, drops comments and PIs from the tree.
+# no fixed encoding, libxml2 reads the <meta> charset of the page.
+_PARSER = html.HTMLParser(recover=True, remove_comments=True, remove_pis=True)
+
+# aux functions
+@functools.lru_cache(maxsize=4096)
+def _quote(name):
+    return ps.quote(name)
+
+@functools.lru_cache(maxsize=16)
+def _page_parser(encoding=None):
+    # _PARSER, or the same settings with the charset declared by the server
+    if encoding is None: return _PARSER
+    return html.HTMLParser(encoding=encoding, recover=True,
+            remove_comments=True, remove_pis=True)
+
+def _declared_charset(req):
+    # charset in the Content-Type header (requests), None if not declared.
+    # req.encoding alone is not enough, requests guesses it for text/*.
+    if 'charset' not in req.headers.get('Content-Type', '').lower():
+        return None
+    return req.encoding
+
+@functools.lru_cache(maxsize=4096)
+def _iau_name(ra_deg, dec_deg):
+    # IAU-style 'JHHMMSS.s+DDMMSS' designation of a position
+    crd = coord.SkyCoord(ra=ra_deg, dec=dec_deg, unit=('deg', 'deg'))
+    return 'J' + crd.ra.to_string(unit=u.hourangle, precision=1, sep='',
+            pad=True) + crd.dec.to_string(precision=0, sep='',
+            alwayssign=True, pad=True)
+
+def _fast_table_rows(node):
+    # stripped cell texts grouped into rows, for a selectolax node.
+    # rows without <td> are skipped, as in HyperLedaSpider._table_rows.
+    rows = [[td_i.text().strip() for td_i in tr_j.css('td')] \
+            for tr_j in node.css('tr')]
+    return [row_i for row_i in rows if row_i]
+
 class HyperLedaSpider:
 
     hyperleda_mirror = 'http://leda.univ-lyon1.fr/'
     req_timeout = 30
+    stream_drain = 64 * 1024 # bytes, see _init_by_name
+
+    # shared HTTP sessions (connection pool), see _get_session
+    _session, _cached_session = None, None
+
+    # on-disk (sqlite) response cache, used if requests_cache is installed
+    cache_name = 'hyperleda_cache'
+    cache_expire = 86400 * 7 # sec
+
+    # compiled XPath locators for the ledacat.cgi page
+    # all the text anchors, found in a single traversal (see _page_anchors)
+    _XP_ANCHORS = etree.XPath("//*[(self::a and ("
+            "contains(text(), 'Celestial position') or "
+            "contains(text(), 'objtype') or "
+            "contains(text(), 'search in the field'))) or "
+            "(self::td and contains(text(), 'Parameter'))]")
+    _XP_TABLES_FROM_ANCHOR = etree.XPath("ancestor::*[3]//table")
+    _XP_PARENT3 = etree.XPath("ancestor::*[3]")
+    _XP_CELLS = etree.XPath(".//tr/td")
+    _XP_HAS_OBJTYPE = etree.XPath("boolean(.//a[contains(text(), 'objtype')])")
+    _XP_HAS_HEADER = etree.XPath(
+            "boolean(//a[contains(text(), 'Celestial position')])")
+
+    @classmethod
+    def _page_anchors(cls, tree):
+
+        # bucket the anchors by the text they matched, in document order.
+        anchors = {'celestial': [], 'objtype': [], 'nametab': [],
+                   'parameter': []}
+        for elm_i in cls._XP_ANCHORS(tree):
+            text_i = elm_i.text or ''
+            if elm_i.tag == 'td': anchors['parameter'].append(elm_i)
+            elif 'Celestial position' in text_i:
+                anchors['celestial'].append(elm_i)
+            elif 'objtype' in text_i: anchors['objtype'].append(elm_i)
+            else: anchors['nametab'].append(elm_i)
+        return anchors
+
+    @classmethod
+    def _table_rows(cls, tab):
+
+        # stripped cell texts of a table, grouped into rows. one XPath call.
+        return [[td_i.text_content().strip() for td_i in tds_j] for _, tds_j \
+                in groupby(cls._XP_CELLS(tab), key=methodcaller('getparent'))]
+
+    @staticmethod
+    def _parse_coords_table(rows):
+
+        # rows of (key, value), last one may be ('', 'Precision: ...')
+        coords = [tuple(row_i) for row_i in rows]
+        if coords[-1][0] == '': # convert 'Precision' key
+            key_i, _, val_i = coords[-1][1].partition(':')
+            coords[-1] = (key_i.strip(), val_i.strip())
+        return dict(coords) # convert to dict
+
+    @staticmethod
+    def _parse_data_table(rows):
 
-    def __init__(self, name=None, radec=None, objtype='G'):
+        # rows of (parameter, value [± error], unit, description)
+        pars, vals = [], []
+        for row_i in rows:
+            par_i, unit_i, descr_i = row_i[0], row_i[2], row_i[3]
+            # split value and error.
+            val_i, pm_i, err_i = row_i[1].partition(_PM)
+            if pm_i: val_i, err_i = val_i.strip(), err_i.strip()
+            # convert numeric values to float type
+            if _NUMERIC_RE.match(val_i): val_i = float(val_i)
+            if pm_i and _NUMERIC_RE.match(err_i): err_i = float(err_i)
+            else: err_i = np.nan
+            pars.append(par_i)
+            vals.append((val_i, err_i, unit_i, descr_i))
+        return dict(zip(pars, vals)) # build the dict in one go
+
+    @classmethod
+    def _get_session(cls, cache=False):
+
+        # build the pooled session on first use, then reuse it.
+        cache = cache and (requests_cache is not None)
+        session_attr = '_cached_session' if cache else '_session'
+        if getattr(cls, session_attr) is None:
+            if cache:
+                session = requests_cache.CachedSession(cls.cache_name,
+                        backend='sqlite', expire_after=cls.cache_expire,
+                        allowable_methods=('GET', 'POST')) # POST: sql_query
+            else: session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50,
+                    max_retries=Retry(total=3, backoff_factor=0.3))
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            setattr(cls, session_attr, session)
+        return getattr(cls, session_attr)
+
+    def __init__(self, name=None, radec=None, objtype='G', cache=True):
+
+        # use the on-disk response cache?
+        self._cache = cache
 
         # if name is available, try this first,
         if name is not None:
@@ -40,134 +191,300 @@ class HyperLedaSpider:
             if not isinstance(radec, (tuple, list)):
                 raise TypeError("'radec' is not a 2-tuple.")
 
-            data_dic = self._init_by_radec(radec, objtype)
-            if data_dic != {}: self.data = data_dic
+            query_info = self._init_by_radec(radec, objtype)
+            if len(query_info) > 0: self.data = query_info[0]['data']
+            # take the nearest one.
 
         # complain if failed.
         if not hasattr(self, 'data'):
             raise RuntimeError('')
 
-    def _init_by_radec(self, radec, objtype, sort_by_dist):
+    def _init_by_radec(self, radec, objtype, sort_by_dist=True):
 
         # construct IAU-style sky coord. # TODO: other formats
         crd = coord.SkyCoord(ra=radec[0], dec=radec[1], unit=('deg', 'deg'))
-        crd_str = crd.to_string(style='hmsdms').encode('utf-8')
-        crd_str = 'J' + crd.ra.to_string(precision=1, sep=''\
-                ).encode('utf-8') + crd.dec.to_string(precision=0, sep='', \
-                alwayssign=True).encode('utf-8')
-        req_url = self.hyperleda_mirror + 'ledacat.cgi?o=' + ps.quote(crd_str)
+        crd_str = _iau_name(radec[0], radec[1])
+        req_url = self.hyperleda_mirror + 'ledacat.cgi?o=' + _quote(crd_str)
 
         # query and parse,
-        req = requests.get(req_url, timeout=self.req_timeout)
-        soup = BeautifulSoup(req.text, "html5lib")
+        req = self._get_session(self._cache).get(req_url,
+                timeout=self.req_timeout)
+        tree = html.fromstring(req.content,
+                parser=_page_parser(_declared_charset(req)))
 
         # dict to hold the results
         query_info = []
+        anchors = self._page_anchors(tree)
 
         # get name tables
-        name_tabs = soup.find_all('a', text=re.compile(r'search in the field'))
+        name_tabs = anchors['nametab']
         for i_name_tab, name_tab_i in enumerate(name_tabs):
-            name_tab_i = name_tab_i.parent.find_all('a')
-            name_i = name_tab_i[0].text
+            name_tab_i = name_tab_i.getparent().find('.//a')
+            name_i = name_tab_i.text_content()
             query_info.append({})
             query_info[i_name_tab] = {'name': name_i}
 
         # get header tables for each object
-        header_tabs = soup.find_all('a', text=re.compile(r'Celestial position'))
+        header_tabs = anchors['celestial']
         for i_header_tab, header_tab_i in enumerate(header_tabs):
-            header_tab_i = header_tab_i.parent.parent.parent.findChildren('table')
-            coord_rows = header_tab_i[0].find_all('tr')
-            coords = [tuple([td_i.text for td_i in \
-                    tr_j.find_all('td')]) for tr_j in coord_rows]
-            if coords[-1][0] == '': # convert 'Precision' key
-                coords[-1] = tuple([w.strip() for w in coords[-1][1].split(':')])
-            coords = {key_i: val_i for key_i, val_i in coords} # convert to dict
+            header_tab_i = self._XP_TABLES_FROM_ANCHOR(header_tab_i)
+            coords = self._table_rows(header_tab_i[0])
+            coords = self._parse_coords_table(coords)
             if len(header_tab_i) > 1: # if there is alternative names, make a list
-                alt_names = [w.text for w in header_tab_i[1].find_all('td')]
+                alt_names = [w.text_content().strip() for w in \
+                        self._XP_CELLS(header_tab_i[1])]
             else: alt_names = [] # otherwise, give an empty list.
             query_info[i_header_tab]['coords'] = coords
             query_info[i_header_tab]['alt_names'] = alt_names
 
         # get property table
-        data_tabs = soup.find_all('td', text=re.compile(r'Parameter'))
+        data_tabs = anchors['parameter']
         for i_data_tab, data_tab_i in enumerate(data_tabs):
-            data_rows = data_tab_i.parent.parent.parent.find_all('tr')
-            data_dic_i = {}
-            for row_i in data_rows[1:]: # skip the header
-                row_i = [w.text.strip() for w in row_i.find_all('td')]
-                par_i, unit_i, descr_i = row_i[0], row_i[2], row_i[3]
-                # split value and error.
-                if u'±' not in row_i[1]: val_i, err_i = row_i[1], 'NaN'
-                else: val_i, err_i = [w.strip() for w in row_i[1].split(u'±')]
-                try:  val_i, err_i = float(val_i), float(err_i)
-                except: pass # convert numeric values to float type
-                data_dic_i[par_i] = (val_i, err_i, unit_i, descr_i)
+            data_tab_i = next(data_tab_i.iterancestors('table'))
+            data_rows = self._table_rows(data_tab_i)
+            # lxml does not insert <tbody>, so do not count parents.
+            data_dic_i = self._parse_data_table(data_rows[1:]) # skip the header
             query_info[i_data_tab]['data'] = data_dic_i
 
         # take only galaxies, if necessary
         if objtype is not None:
             query_info_tr = []
-            for idx, val in query_info.items():
+            for val in query_info:
                 if val['data']['objtype'][0] != objtype: continue
                 query_info_tr.append(val)
             query_info = query_info_tr # overwrite
 
         # sort with separation, if necessary
-        if sort_by_dist is True:
-            dist, query_info_sorted = []
-            for val in query_info:
-                crd_i = coord.SkyCoord(val['coords']['J2000'], unit=('hour', 'deg'))
-                dist.append(crd.separation(crd_i).arcmin)
-            for sort_idx_i in np.argsort(dist):
-                query_info_sorted.append(query_info[sort_idx_i])
+        if sort_by_dist is True and len(query_info) > 1:
+            crds = coord.SkyCoord([val['coords']['J2000'] for val in \
+                    query_info], unit=('hour', 'deg')) # all at once
+            dist = crd.separation(crds).arcmin
+            query_info = [query_info[idx] for idx in np.argsort(dist)]
 
+        return query_info
 
     def _init_by_name(self, name):
 
         # query
-        req_url = self.hyperleda_mirror + 'ledacat.cgi?o=' + ps.quote(name)
-        req = requests.get(req_url, timeout=self.req_timeout)
+        req_url = self.hyperleda_mirror + 'ledacat.cgi?o=' + _quote(name)
+        session = self._get_session(self._cache)
+
+        # a cached session reads the whole body anyway, no need to stream.
+        if session is self._cached_session:
+            req = session.get(req_url, timeout=self.req_timeout)
+            return self._parse_name_page(req.content, _declared_charset(req))
+
+        # stream and parse, stop once the data table is complete.
+        with session.get(req_url, stream=True,
+                timeout=self.req_timeout) as req:
+            # incremental parser, same settings as _page_parser
+            parser = etree.HTMLPullParser(events=('end',), tag='table',
+                    encoding=_declared_charset(req), recover=True,
+                    remove_comments=True, remove_pis=True)
+            parser.set_element_class_lookup(html.HtmlElementClassLookup())
+            chunks = req.iter_content(8192)
+            for chunk in chunks:
+                parser.feed(chunk)
+                if any(self._XP_HAS_OBJTYPE(tab_i) and \
+                        self._XP_HAS_HEADER(tab_i) \
+                        for _, tab_i in parser.read_events()):
+                    break # header and data tables seen, skip the rest.
+            # read a short remainder, so the connection goes back to the
+            # pool. a longer one is cheaper to drop with the connection.
+            n_left = 0
+            for chunk in chunks:
+                n_left += len(chunk)
+                if n_left > self.stream_drain: break
+
+        # empty or broken page: nothing found, as for a failed query.
+        try: tree = parser.close()
+        except (etree.XMLSyntaxError, etree.ParserError): return {}
+
+        return self._parse_name_tables(self._name_page_tables(tree))
+
+    @classmethod
+    def _parse_name_page(cls, page, encoding=None):
+
+        '''
+            Parse the ledacat.cgi page (bytes) of a single object into a dict.
+            'encoding': charset declared by the server, if any.
+        '''
+
+        # locate the tables, with selectolax if the page decodes cleanly.
+        # otherwise let libxml2 find the <meta> charset.
+        if _FastHTMLParser is not None:
+            try: text = page.decode(encoding or 'utf-8')
+            except (UnicodeDecodeError, LookupError): text = None
+            if text is not None:
+                return cls._parse_name_tables(cls._name_page_tables_fast(text))
+        try: tree = html.fromstring(page, parser=_page_parser(encoding))
+        except (etree.XMLSyntaxError, etree.ParserError): return {}
+        return cls._parse_name_tables(cls._name_page_tables(tree))
+
+    @classmethod
+    def _parse_name_tables(cls, tabs):
+
+        # tabs: (coord_rows, alt_names, data_rows) from _name_page_tables
+        if tabs is None: return {} # return empty dic if query failed.
+        coord_rows, alt_names, data_rows = tabs
+
+        # read the table of coordinates
+        coords = cls._parse_coords_table(coord_rows)
+
+        # make RA/Dec machine-readable # TODO
+
+        # read the data table
+        data_dic = cls._parse_data_table(data_rows[1:]) # skip the header
+
+        return data_dic
 
-        # parse
-        soup = BeautifulSoup(req.text, "html5lib")
+    @classmethod
+    def _name_page_tables(cls, tree):
 
         # find coordinates and alternate names
-        header_tab = soup.find_all('a', text=re.compile(r'Celestial position'))
-        if len(header_tab) == 0: return {} # return empty dic if query failed.
-        header_tab = header_tab[0].parent.parent.parent.findChildren('table')
+        anchors = cls._page_anchors(tree)
+        if len(anchors['celestial']) == 0: return None
+        header_tab = cls._XP_TABLES_FROM_ANCHOR(anchors['celestial'][0])
+        if len(header_tab) == 0: return None
         # first: celestial coord, second: alt names
 
-        # read the table of coordinates
-        coord_rows = header_tab[0].find_all('tr')
-        coords = [tuple([td_i.text for td_i in \
-                tr_j.find_all('td')]) for tr_j in coord_rows]
-        if coords[-1][0] == '': # convert 'Precision' key
-            coords[-1] = tuple([w.strip() for w in coords[-1][1].split(':')])
-        coords = {key_i: val_i for key_i, val_i in coords} # convert to dict
-
-        # make RA/Dec machine-readable # TODO
+        # cells of the table of coordinates
+        coord_rows = cls._table_rows(header_tab[0])
 
         # read the table of alternate names
         if len(header_tab) > 1:
-            alt_names = [w.text for w in header_tab[1].find_all('td')]
+            alt_names = [w.text_content().strip() for w in \
+                    cls._XP_CELLS(header_tab[1])]
         else: alt_names = []
 
         # find data table
-        data_tab = soup.find_all('a', text=re.compile(r'objtype'))
-        data_tab = data_tab[0].parent.parent.parent
-        data_rows = data_tab.find_all('tr')
-        data_dic = {}
-        for row_i in data_rows[1:]: # skip the header
-            row_i = [w.text.strip() for w in row_i.find_all('td')]
-            par_i, unit_i, descr_i = row_i[0], row_i[2], row_i[3]
-            # split value and error.
-            if u'±' not in row_i[1]: val_i, err_i = row_i[1], 'NaN'
-            else: val_i, err_i = [w.strip() for w in row_i[1].split(u'±')]
-            try: val_i, err_i = float(val_i), float(err_i)
-            except: pass # convert numeric values to float type
-            data_dic[par_i] = (val_i, err_i, unit_i, descr_i)
-
-        return data_dic
+        if len(anchors['objtype']) == 0: return None
+        data_tab = cls._XP_PARENT3(anchors['objtype'][0])
+        if len(data_tab) == 0: return None
+        data_rows = cls._table_rows(data_tab[0])
+
+        return coord_rows, alt_names, data_rows
+
+    @staticmethod
+    def _name_page_tables_fast(page):
+
+        # same as _name_page_tables, on selectolax's lexbor parser. page: str
+        tree = _FastHTMLParser(page)
+        header_a, data_a = None, None
+        for a_i in tree.css('a'):
+            text_i = a_i.text(deep=False)
+            if header_a is None and 'Celestial position' in text_i:
+                header_a = a_i
+            if data_a is None and 'objtype' in text_i: data_a = a_i
+        if header_a is None or data_a is None: return None
+
+        # tables below the third parent of the anchors
+        header_tab, data_tab = header_a, data_a
+        for _ in range(3):
+            if header_tab is not None: header_tab = header_tab.parent
+            if data_tab is not None: data_tab = data_tab.parent
+        if header_tab is None or data_tab is None: return None
+        header_tab = header_tab.css('table')
+        if len(header_tab) == 0: return None
+
+        coord_rows = _fast_table_rows(header_tab[0])
+        if len(header_tab) > 1:
+            alt_names = [w.text().strip() for w in header_tab[1].css('td')]
+        else: alt_names = []
+        data_rows = _fast_table_rows(data_tab)
+
+        return coord_rows, alt_names, data_rows
+
+    @classmethod
+    async def _fetch(cls, session, sem, name, delay):
+
+        # one request per object, at most 'concurrency' in flight.
+        req_url = cls.hyperleda_mirror + 'ledacat.cgi?o=' + _quote(name)
+        await asyncio.sleep(delay) # spread the start times, be polite
+        async with sem:
+            try:
+                async with session.get(req_url, timeout=aiohttp.ClientTimeout(
+                        total=cls.req_timeout)) as req:
+                    if req.status != 200: # e.g. 503 when throttled
+                        return name, None, None
+                    return name, await req.read(), req.charset
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return name, None, None # treat as a failed query
+
+    @classmethod
+    async def _gather(cls, names, concurrency, stagger):
+
+        sem = asyncio.Semaphore(concurrency)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await asyncio.gather(*[cls._fetch(session, sem, name_i,
+                    i_name * stagger) for i_name, name_i in enumerate(names)])
+
+    @classmethod
+    def query_many(cls, names, concurrency=50, stagger=0.05):
+
+        '''
+            Query a list of objects by name with concurrent requests.
+            'names': list of str, names of the objects,
+            'concurrency': max number of requests in flight, default: 50,
+            'stagger': delay (sec) between request starts, default: 0.05.
+            Returns a dict of name -> data dict, {} if no object is found
+            and None if the request failed (network error, non-200 status).
+        '''
+
+        if aiohttp is None:
+            raise ImportError("'query_many' requires aiohttp.")
+
+        # fetch concurrently, then parse the pages here.
+        pages = asyncio.run(cls._gather(names, concurrency, stagger))
+        return {name_i: (cls._parse_name_page(page_i, charset_i) \
+                if page_i is not None else None) \
+                for name_i, page_i, charset_i in pages}
+
+    @classmethod
+    def sql_query(cls, columns, where=None, names=None, cache=True):
+
+        '''
+            Query the HyperLEDA SQL interface, return an astropy Table.
+            'columns': list of str (or str), columns to select, e.g.
+                    ['pgc', 'objname', 'objtype', 'al2000', 'de2000'],
+            'where': str, SQL condition (without 'WHERE'), default: None,
+            'names': list of str, match 'objname' against these names.
+                    HyperLEDA uses its own designations, e.g. 'NGC4486'.
+            'cache': use the on-disk response cache, default: True.
+            One request covers all objects. Returns None if nothing
+            matched, in which case fall back to the name query.
+        '''
+
+        # build the condition
+        if isinstance(columns, str): columns = [columns]
+        conds = []
+        if names:
+            conds.append('objname in (' + ','.join(["'" + \
+                    w.replace("'", "''") + "'" for w in names]) + ')')
+        if where: conds.append('(' + where + ')')
+        if not conds:
+            raise ValueError("Need 'where' or 'names' to select objects.")
+
+        # query the mean-data table, VOTable output. POST, since a long
+        # list of names does not fit in a URL.
+        req_par = {'n': 'meandata', 'c': 'o', 'of': '1,leda,simbad',
+                   'nra': 'l', 'nakd': '1', 'd': ','.join(columns),
+                   'sql': ' and '.join(conds), 'ob': '', 'a': 'x'}
+        req = cls._get_session(cache).post(cls.hyperleda_mirror + 'fG.cgi',
+                data=req_par, timeout=cls.req_timeout)
+        if req.status_code != 200: return None # server error, throttled
+
+        # decode the whole table at once
+        try:
+            tab = votable.parse_single_table(io.BytesIO(req.content)
+                    ).to_table(use_names_over_ids=True)
+        except IndexError: # no table in the response
+            return None
+        except ValueError: # not a VOTable, e.g. an SQL error page
+            return None
+        if len(tab) == 0: return None
+        return tab
 
 if __name__ == '__main__':
     a = HyperLedaSpider('M87')
@@ -14,36 +14,90 @@ import warnings
 
 import re
 import six
+import numbers
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import methodcaller
 
 import requests
 import urllib.parse as ps
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import html, etree
+
+try: import requests_cache
+except ImportError: requests_cache = None # on-disk cache is optional
 
 import numpy as np
+import pandas as pd
 from astropy.io import votable
+import astropy.units as u
 from astropy.coordinates import SkyCoord
 from astropy.utils.exceptions import AstropyWarning
 
 # suppress astropy warnings
 warnings.simplefilter('ignore', category=AstropyWarning)
 
+# precompiled patterns
+_RE_MULTISPACE_SUB = re.compile(r' +').sub
+_RE_DIST_COUNT = re.compile(r'Distances found in NED')
+_RE_SUMM_STAT = re.compile(r'Computed Summary Statistics')
+_RE_DISTMOD = re.compile(r'Distance Modulus')
+_RE_INDIVIDUAL = re.compile(r'Individually Referenced')
+_RE_MM = re.compile(r'(m-M)')
+
+# compiled XPath, source list table is next to its 'SOURCE LIST' title
+_XP_SOURCE_TABLE = etree.XPath(
+        "//text()[contains(., 'SOURCE LIST')]/../../table[1]")
+_XP_SOURCE_CELLS = etree.XPath('(.//tr)[position() > 2]/td') # skip headers
+_XP_CROSS_ID_TABLE = etree.XPath(
+        "(//text()[contains(., 'CROSS-IDENTIFICATIONS')]/../..//table)[1]")
+
+# build only the wanted part of pages parsed with bs4
+_CLASS_TABLE_STRAINER = SoupStrainer('table',
+        attrs={'summary': 'Classification Results'})
+
 # aux functions
-def _split_link(bs_elm):
-    text = bs_elm.text.strip().replace('*', '')
-    try: href = bs_elm.find_all('a')[0]['href']
-    except: href = None
-    return (text, href)
+def _split_link(elm):
+    text = elm.text_content().strip().replace('*', '')
+    link = elm.find('.//a') # stops at the first link
+    return (text, link.get('href') if link is not None else None)
+
+def _radec_unit(text):
+    # HMS/DMS or decimal degrees, for RA/Dec in string form
+    if (':' in text) or ('h' in text): return ('hour', 'deg')
+    return ('deg', 'deg')
+
+def _column(candidates, idx):
+    # text of the idx-th cell of every candidate row
+    return [cd_i[idx][0] for cd_i in candidates]
+
+_EMPTY_CELLS = frozenset(['', '...', '--']) # NED placeholders, not numbers
 
 def _s2i(text, bad_value=-1):
-    try: val = int(text.strip())
-    except: val = bad_value
+    text = text.strip()
+    if text in _EMPTY_CELLS: return bad_value # skip raising on empty cells
+    try: val = int(text)
+    except ValueError: val = bad_value
     return val
 
 def _s2f(text, bad_value=np.nan):
-    try: val = float(text.strip())
-    except: val = bad_value
+    text = text.strip()
+    if text in _EMPTY_CELLS: return bad_value
+    try: val = float(text)
+    except ValueError: val = bad_value
     return val
 
+def _float_column(candidates, idx):
+    # numeric column converted into a preallocated array, bad values to NaN
+    return np.fromiter(map(_s2f, _column(candidates, idx)),
+                       dtype='f8', count=len(candidates))
+
+def _int_column(candidates, idx):
+    # integer column converted into a preallocated array, bad values to -1
+    return np.fromiter(map(_s2i, _column(candidates, idx)),
+                       dtype='i4', count=len(candidates))
+
 # custom exception
 class IdentificationError(Exception):
     strerror = "Failed to identify the source."
@@ -57,9 +111,16 @@ class NedSpider:
         YJ Qin, Jan 12 2018 @ Tucson
     '''
 
+    # per-instance attributes, no __dict__.
+    __slots__ = ('ned_mirror_url', 'req_timeout', '_session', '_cosmo_params',
+                 '_candidates', 'candidates', 'N_candidates', '_details',
+                 '_class_cache', '_name_to_idx')
+
     # NED mirror settings
     _ned_mirror_url = 'https://ned.ipac.caltech.edu/'
     _req_timeout = 30
+    _cache_expire = 86400 * 30 # sec, for the optional on-disk cache
+    _pool_maxsize = 16 # connections per host, also caps fetch_all workers
 
     # NED cosmology settings
     _hconst, _omegam, _omegav, _corr_z = 73, 0.27, 0.73, 1
@@ -69,7 +130,28 @@ class NedSpider:
 
     def __init__(self, name=None, radec=None, radius=1.,
             ned_mirror_url=None, req_timeout=None,
-            match_only_galaxy=True, match_unique=False):
+            match_only_galaxy=True, match_unique=False, cache_path=None):
+
+        # one pooled, keep-alive session for all queries of this object.
+        # with 'cache_path', responses are also cached in a sqlite file.
+        if cache_path is not None and requests_cache is None:
+            warnings.warn('requests_cache not installed, cache disabled.')
+        if cache_path is not None and requests_cache is not None:
+            self._session = requests_cache.CachedSession(cache_path,
+                    backend='sqlite', expire_after=self._cache_expire)
+        else: self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=4,
+                pool_maxsize=self._pool_maxsize, max_retries=2))
+        self._session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+        # parsed results of detail queries, by candidate index
+        self._details, self._class_cache = {}, {}
+
+        # our cosmological settings, as query parameters of detail pages.
+        self._cosmo_params = {'hconst': str(self._hconst),
+                              'omegam': str(self._omegam),
+                              'omegav': str(self._omegav),
+                              'corr_z': str(self._corr_z)}
 
         # if there is a name, try it first.
         if isinstance(name, str):
@@ -138,7 +220,7 @@ class NedSpider:
         #print(req_url)
         # TODO: use urllib to construct url.
         # did not use VOTable because it does not include objid.
-        req = requests.get(req_url, timeout=self.req_timeout)
+        req = self._session.get(req_url, timeout=self.req_timeout)
 
         # convert this to votable // obsolete
         '''
@@ -152,31 +234,9 @@ class NedSpider:
         '''
         # no longer used. VOTable features not well supported.
 
-        # parse the page
-        soup = BeautifulSoup(req.text, "html5lib")
-        src_tab = soup(text=re.compile(r'SOURCE LIST'))
-        if len(src_tab) == 0: # object not identified
-            raise IdentificationError('Source not identified.')
-        # get the inner table (source list)
-        src_tab = src_tab[0].parent.parent.find('table', recursive=False)
-        src_rows = src_tab.find_all('tr')[2:] # skip header rows
-
-        # get candidate sources
-        self._candidates = []
-        for row_i in src_rows: # for every identified object (row),
-            cols_i = row_i.find_all('td') # break into table cells
-            self._candidates.append(tuple( \
-                    [_split_link(col_i) for col_i in cols_i]))
-            # convert to list of tuple of (value, link)
-
-        # take only galaxies?
-        if match_only_galaxy:
-            self._candidates = list(filter(
-                    lambda x: x[4][0] in self._ned_galaxy_types,
-                    self._candidates))
-        if single_only:
-            self._candidates = list(filter(
-                    lambda x: x[4][0] == 'G', self._candidates))
+        # parse the page, get candidate sources (only galaxies?)
+        self._candidates = self._parse_source_list(req.content,
+                match_only_galaxy=match_only_galaxy, single_only=single_only)
 
         # check how many objects matched
         N_src = len(self._candidates)
@@ -199,48 +259,23 @@ class NedSpider:
         '''
 
         # convert RA/Dec to SkyCoord if necessary format.
-        if not isinstance(radec, SkyCoord):
-
-            ra, dec, crd = None, None, None # should be a SkyCoord in the end.
-            radec_format_complaint = "'radec' should be a two-element " \
-                    "tuple/list/array of RA and Dec, or a SkyCoord object."
-
-            try: # try to construct like a two-element tuple/list/array
-                # print(radec)
-                ra, dec = radec # split into two
-                if isinstance(ra, str) and isinstance(dec, str): # two strings
-                    if (':' in ra) or ('h' in ra): # HMS/DMS format
-                        crd = SkyCoord(ra, dec, unit=('hour', 'deg'))
-                    else: # RA/Dec in decimal degrees, in string form
-                        crd = SkyCoord(ra, dec, unit=('deg', 'deg'))
-                elif isinstance(ra, float) and isinstance(dec, float): # floats
-                    crd = SkyCoord(ra, dec, unit=('deg', 'deg'))
-                else:
-                    raise TypeError(radec_format_complaint)
-
-            # case: not iterable
-            except TypeError:
-                raise TypeError(radec_format_complaint)
-
-            # case: iterable but wrong number
-            except ValueError: # usually "too many to unpack"
-                if isinstance(radec, str): # not a single string?
-                    if (':' in radec) or ('h' in 'radec'):
-                        crd = SkyCoord(radec, unit=('hour', 'deg'))
-                    else:
-                        crd = SkyCoord(radec, unit=('deg', 'deg'))
-                else:
-                    raise TypeError(radec_format_complaint)
-
-            # complain anyway
-            except:
-                raise
-
-            # sanity check
-            if crd is None:
-                raise RuntimeError('Failed to understand "radec".')
+        radec_format_complaint = "'radec' should be a two-element " \
+                "tuple/list/array of RA and Dec, or a SkyCoord object."
+
+        if isinstance(radec, SkyCoord):
+            pass
+        elif isinstance(radec, str): # a single string
+            radec = SkyCoord(radec, unit=_radec_unit(radec))
+        elif isinstance(radec, (tuple, list, np.ndarray)) and len(radec) == 2:
+            ra, dec = radec # split into two
+            if isinstance(ra, str) and isinstance(dec, str): # two strings
+                radec = SkyCoord(ra, dec, unit=_radec_unit(ra))
+            elif isinstance(ra, float) and isinstance(dec, float): # floats
+                radec = SkyCoord(ra, dec, unit=('deg', 'deg'))
             else:
-                radec = crd # overwrite radec.
+                raise TypeError(radec_format_complaint)
+        else:
+            raise TypeError(radec_format_complaint)
 
         # overwrite default mirror settings
         if ned_mirror_url is None:
@@ -275,31 +310,9 @@ class NedSpider:
         # NOTE: NED uses arcmin. Me too. TODO: use better solution
 
         # get and parse
-        req = requests.get(req_url, timeout=self.req_timeout)
-        soup = BeautifulSoup(req.text, "html5lib")
-        src_tab = soup(text=re.compile(r'SOURCE LIST'))
-        if len(src_tab) == 0: # object not identified
-            raise IdentificationError('Source not identified.')
-        # get the inner table (source list)
-        src_tab = src_tab[0].parent.parent.find('table', recursive=False)
-        src_rows = src_tab.find_all('tr')[2:] # skip header rows
-
-        # get candidate sources
-        self._candidates = []
-        for row_i in src_rows: # for every identified object (row),
-            cols_i = row_i.find_all('td') # break into table cells
-            self._candidates.append(tuple( \
-                    [_split_link(col_i) for col_i in cols_i]))
-        # convert to list of tuple of (value, link)
-
-        # take only galaxies?
-        if match_only_galaxy:
-            self._candidates = list(filter(\
-                    lambda x: x[4][0] in self._ned_galaxy_types,
-                    self._candidates))
-        if single_only:
-            self._candidates = list(filter(
-                    lambda x: x[4][0] == 'G', self._candidates))
+        req = self._session.get(req_url, timeout=self.req_timeout)
+        self._candidates = self._parse_source_list(req.content,
+                match_only_galaxy=match_only_galaxy, single_only=single_only)
         # for cad_i in candidates: print(cad_i)
 
         # check how many objects matched
@@ -316,10 +329,42 @@ class NedSpider:
 
         return
 
+    def _parse_source_list(self, page, match_only_galaxy=True,
+            single_only=True):
+
+        '''
+            Parse the 'SOURCE LIST' table of a search result page (bytes),
+            returns candidates as a list of tuple of (value, link).
+            'match_only_galaxy', 'single_only': keep only galaxies / 'G'.
+        '''
+
+        try: src_tab = _XP_SOURCE_TABLE(html.fromstring(page))
+        except (etree.ParserError, etree.XMLSyntaxError): # empty page
+            raise IdentificationError('Source not identified.')
+        if len(src_tab) == 0: # object not identified
+            raise IdentificationError('Source not identified.')
+
+        # take only (single) galaxies? 'G' is also one of the galaxy types.
+        if single_only: obj_types = frozenset(['G'])
+        elif match_only_galaxy: obj_types = frozenset(self._ned_galaxy_types)
+        else: obj_types = None
+
+        # cells of all identified objects in one XPath call, grouped by row
+        candidates = []
+        for _, cols_j in groupby(_XP_SOURCE_CELLS(src_tab[0]),
+                                 key=methodcaller('getparent')):
+            cols_j = list(cols_j)
+            if obj_types is not None and (len(cols_j) < 5 \
+                    or _split_link(cols_j[4])[0] not in obj_types):
+                continue # check the type before converting the whole row
+            candidates.append(tuple([_split_link(col_i) for col_i in cols_j]))
+
+        return candidates
+
     def _tabulate_candidates(self):
 
         '''
-            Convert search results (list of tuples of tuples...) into recarray
+            Convert search results (list of tuples of tuples...) into table
             TODO: doc for myself.
         '''
 
@@ -327,48 +372,58 @@ class NedSpider:
         # 0 row id & link, 1 name, 2 RA, 3 dec, 4 type, 5 RV, 6 z, 7 qual,
         # 8 mag, 9 ang sep, 10 refs, 11 notes, 12 phot, 13 posn, 14 vel & z,
         # 15 diam, 16 assoc, 17 imgs, 18 spec, 19 row & link
-        self.candidates = np.empty(shape=(len(self._candidates),),
-                dtype=[('name', 'S48'), ('RA_h', 'S24'), ('Dec_h', 'S24'),
-                       ('RA_d', 'f8'), ('Dec_d', 'f8'), ('type', 'S8'),
-                       ('vel', 'f8'), ('z', 'f8'), ('zqual', 'S8'),
-                       ('mag', 'f8'), ('dist', 'f8'), ('N_ref', 'i4'),
-                       ('N_note', 'i4'), ('N_phot', 'i4'), ('N_posn', 'i4'),
-                       ('N_velz', 'i4'), ('N_diam', 'i4'), ('N_assoc', 'i4')])
-
-        # convert and copy columns
-        for i_cd, cd_i in enumerate(self._candidates):
-
-            # convert hexadecimal HMS/DMS to degrees
-            crd_i = SkyCoord(cd_i[2][0], cd_i[3][0], frame='icrs')
-
-            # copy columns
-            self.candidates[i_cd] = (
-                cd_i[1][0], cd_i[2][0], cd_i[3][0], crd_i.ra.deg, crd_i.dec.deg,
-                cd_i[4][0], _s2f(cd_i[5][0]), _s2f(cd_i[6][0]), cd_i[7][0],
-                _s2f(cd_i[8][0]), _s2f(cd_i[9][0]), _s2i(cd_i[10][0]),
-                _s2i(cd_i[11][0]), _s2i(cd_i[12][0]), _s2i(cd_i[13][0]),
-                _s2i(cd_i[14][0]), _s2i(cd_i[15][0]), _s2i(cd_i[16][0])
-            )
+
+        cd = self._candidates
+
+        # convert sexagesimal HMS/DMS to degrees, all at once
+        crds = SkyCoord(_column(cd, 2), _column(cd, 3),
+                        unit=(u.hourangle, u.deg), frame='icrs')
+
+        # column-oriented table, one array per column, bad values NaN or -1
+        self.candidates = pd.DataFrame({
+                'name': _column(cd, 1), 'RA_h': _column(cd, 2),
+                'Dec_h': _column(cd, 3),
+                'RA_d': crds.ra.deg, 'Dec_d': crds.dec.deg,
+                'type': _column(cd, 4),
+                'vel': _float_column(cd, 5), 'z': _float_column(cd, 6),
+                'zqual': _column(cd, 7),
+                'mag': _float_column(cd, 8), 'dist': _float_column(cd, 9),
+                'N_ref': _int_column(cd, 10), 'N_note': _int_column(cd, 11),
+                'N_phot': _int_column(cd, 12), 'N_posn': _int_column(cd, 13),
+                'N_velz': _int_column(cd, 14), 'N_diam': _int_column(cd, 15),
+                'N_assoc': _int_column(cd, 16)})
 
         # how many candidates in the list
-        self.N_candidates = self.candidates.size
+        self.N_candidates = len(self.candidates)
+
+        # index of candidates by name, None if the name is not unique.
+        self._name_to_idx = {}
+        for i_cd, name_i in enumerate(_column(cd, 1)):
+            self._name_to_idx[name_i] = None \
+                    if name_i in self._name_to_idx else i_cd
 
-    def _retrieve_page(self, idx=None, name=None,):
+    @property
+    def candidates_rec(self):
 
         '''
-            Retrieve NED detailed search result of a source.
-            TODO: doc for myself.
+            Candidate list as numpy recarray, for code using the old format.
         '''
 
-        # create "cache" of soup objects if necessary
-        if not hasattr(self, '_soup'):
-            self._soup = {}
+        return self.candidates.to_records(index=False)
 
-        # if the desired page is already retrieved, return soup directly
-        if idx  in self._soup:
-            return self._soup[idx]
-        if name in self._soup:
-            return self._soup[name]
+    def _resolve_candidate(self, idx=None, name=None):
+
+        '''
+            Find the candidate by index or name, returns (idx, name).
+        '''
+
+        # any integer type is a valid index (e.g. numpy ints from the table)
+        if idx is not None:
+            if not isinstance(idx, numbers.Integral):
+                raise TypeError("'idx' should be an integer.")
+            idx = int(idx)
+        if name is not None and not isinstance(name, str):
+            raise TypeError("'name' should be a string.")
 
         # when calling with neither name nor idx,
         if idx is None and name is None:
@@ -376,43 +431,52 @@ class NedSpider:
                 raise RuntimeError('Multiple candidates matched in the list, ' \
                       'Need either idx or name to specify.')
             else: # otherwise, use the only source in the list.
-                idx, name = 0, self.candidates[0]['name']
+                idx, name = 0, self.candidates.at[0, 'name']
 
         # did we get source index and name in the previous step?
-        if idx is None and name is None:
+        if idx is None or name is None:
 
-            if isinstance(idx, int): # if we have a valid index, use it.
-                name = self.candidates[idx]['name']
+            if idx is not None: # if we have a valid index, use it.
+                name = self.candidates.at[idx, 'name']
                 # do we need to validate the value/range of idx?
 
             else: # if idx is not explicitly given, match by name.
-                id_msk = self.candidates['name'] == name.strip()
-                N_fcad = id_msk.astype(int).sum() # number of matched
-                if N_fcad > 1:
-                    raise IdentificationError(\
-                            "More than one candidates matched by the name.")
-                if N_fcad < 1:
+                name = name.strip()
+                if name not in self._name_to_idx:
                     raise IdentificationError(\
                             "No candidate is matched by this name.")
-                idx = idx_msk.tolist().index(True) # write idx with the matched
-                name = name.strip() # overwrite name with stripped as we did.
+                idx = self._name_to_idx[name] # write idx with the matched
+                if idx is None:
+                    raise IdentificationError(\
+                            "More than one candidates matched by the name.")
+
+        return idx, name
+
+    def _ensure_detail(self, idx=None, name=None):
+
+        '''
+            Retrieve NED detailed search result of a source, returns a dict
+            of the fields we use. the page itself is not kept.
+            TODO: doc for myself.
+        '''
+
+        # which candidate? if already retrieved, return fields directly
+        idx, name = self._resolve_candidate(idx=idx, name=name)
+        if idx in self._details:
+            return self._details[idx]
 
         # url for the page of detailed information. parse and modify
         req_url = ps.urlsplit(self.ned_mirror_url + '/' + \
                 self._candidates[idx][0][1]) # now in namedtuple
         query_par = dict(ps.parse_qsl(req_url.query)) # parse query str
+        query_par.update(self._cosmo_params) # apply our cosmological seetings
         query_par['img_stamp'] = 'NO' # saves network traffic
         query_par['of'] = 'table' # return HTML table
 
-        # apply our cosmological seetings
-        query_par['hconst'] = str(self._hconst)
-        query_par['omegam'] = str(self._omegam)
-        query_par['omegav'] = str(self._omegav)
-        query_par['corr_z'] = str(self._corr_z)
-
         # re-assemble url and send request
         req_url = req_url._replace(query=ps.urlencode(query_par)) # better way?
-        req = requests.get(ps.urlunsplit(req_url), timeout=self.req_timeout)
+        req = self._session.get(ps.urlunsplit(req_url),
+                timeout=self.req_timeout)
 
         '''
         # else: # take the first object.
@@ -433,12 +497,13 @@ class NedSpider:
         '''
         # obsolete. debug.
 
-        # bs it and put into pot
-        soup_i = BeautifulSoup(req.text, "html5lib")
-        self._soup[idx]  = soup_i
-        self._soup[name] = soup_i
+        # parse once, extract fields and put into pot
+        try: tree = html.fromstring(req.content)
+        except (etree.ParserError, etree.XMLSyntaxError): # empty page
+            raise IdentificationError('Failed to retrieve the detail page.')
+        self._details[idx] = {'cross_ids': self._parse_cross_ids(tree)}
 
-        return soup_i
+        return self._details[idx]
 
         '''
         # do we need to get its properties?
@@ -462,36 +527,45 @@ class NedSpider:
         '''
         # obsolete, for the change of API. (see NOTE180114A)
 
-    def alias(self, name=None, idx=None, galaxy_only=False,
-              single_only=False, expand_aliases=False):
+    @staticmethod
+    def _parse_cross_ids(tree):
 
         '''
-            Get cross-identified names of this source.
-            TODO: doc
+            Cross-identified names in the detail page, list of (name, type).
         '''
 
-        # retrieve the detailed information page
-        soup_i = self._retrieve_page(name=name, idx=idx)
-
         # find the table of cross-identified names
-        cid_elm = soup_i(text=re.compile(\
-                r'CROSS-IDENTIFICATIONS'))[0].parent.parent
-        cid_tab = cid_elm.find('table').find_all('td') # find table cells
-        cid_names = [w.text.strip() for w in cid_tab] # get identified names
-        cid_names = [re.sub(' +', ' ', w) for w in cid_names]
-        # remove double space in source names. e.g. IRAS__03174-1935
+        cid_tab = _XP_CROSS_ID_TABLE(tree)[0].iter('td') # find table cells
+        cid_names = [_RE_MULTISPACE_SUB(' ', w.text_content().strip()) \
+                for w in cid_tab]
+        # get identified names, remove double space in source names.
+        # e.g. IRAS__03174-1935
         cid_names = list(zip(cid_names[0::2], cid_names[1::2]))
         # group name and type in pairs
         cid_names = list(filter(lambda x: x[0] not in \
                 ['', 'Object Names', 'Type'], cid_names))
         # remove table headers and empty entries
 
+        return cid_names
+
+    def alias(self, name=None, idx=None, galaxy_only=False,
+              single_only=False, expand_aliases=False):
+
+        '''
+            Get cross-identified names of this source.
+            TODO: doc
+        '''
+
+        # names of this candidate, from the (cached) detail page
+        cid_names = list(self._ensure_detail(idx=idx,
+                                             name=name)['cross_ids'])
+
         # remove other kind of sources (IrS, UvS, etc) if required
-        if galaxy_only:
-            cid_names = list(filter(
-                    lambda w: w[1] in self._ned_galaxy_types, cid_names))
-        if galaxy_only:
-            cid_names = list(filter(lambda w: w[1] == 'G', cid_names))
+        if single_only:
+            cid_names = [w for w in cid_names if w[1] == 'G']
+        elif galaxy_only:
+            gtypes = frozenset(self._ned_galaxy_types)
+            cid_names = [w for w in cid_names if w[1] in gtypes]
 
         if expand_aliases: # expand NED-style names to other.
             expand_list = []
@@ -518,29 +592,9 @@ class NedSpider:
             TODO: doc
         '''
 
-        N_phot, phot_link = None, None
-        if idx is None and name is None:
-            if self.N_candidates == 1:
-                N_phot, phot_link = self._candidates[0][12]
-            else:
-                raise RuntimeError('Object not uniquely ' + \
-                        'identified in the candidate list.')
-            # in most cases, this branch should be triggered.
-
-        if N_phot is None and phot_link is None: # failed in the previous step
-            if isinstance(idx, int): # if we have a valid index, use it.
-                N_phot, phot_link = self._candidates[idx][12]
-            else: # try to indentify by name
-                for cad_i in self._candidates:
-                    if cad_i[1][0] == name: # exact match
-                        if N_phot is None:
-                            N_phot, phot_link = cad_i[12]
-                        else:
-                            raise IdentificationError(\
-                                    'More than one candidate matched by name')
-                if N_phot is None:
-                    raise IdentificationError( \
-                            'No candidate is matched by this name.')
+        # which candidate? then the number and link of photometry points
+        idx, name = self._resolve_candidate(idx=idx, name=name)
+        N_phot, phot_link = self._candidates[idx][12]
 
         '''
         # search photometry & SED link in the webpage
@@ -557,18 +611,14 @@ class NedSpider:
         # modify the link so that we can have a XML table
         req_url = ps.urlsplit(self.ned_mirror_url + phot_link) # in namedtuple
         query_par = dict(ps.parse_qsl(req_url.query)) # parse query str
+        query_par.update(self._cosmo_params) # apply our cosmological seetings
         query_par['img_stamp'] = 'NO'
         query_par['of'] = 'xml_main'
 
-        # apply our cosmological seetings
-        query_par['hconst'] = str(self._hconst)
-        query_par['omegam'] = str(self._omegam)
-        query_par['omegav'] = str(self._omegav)
-        query_par['corr_z'] = str(self._corr_z)
-
         # combine into url and send request
         req_url = req_url._replace(query=ps.urlencode(query_par))
-        req = requests.get(ps.urlunsplit(req_url), timeout=self.req_timeout)
+        req = self._session.get(ps.urlunsplit(req_url),
+                timeout=self.req_timeout)
 
         # get the first table and convert to numpy recarray
         phot_table = votable.parse(six.BytesIO(req.content), \
@@ -590,38 +640,19 @@ class NedSpider:
             TODO: doc
         '''
 
-        ned_objname = None # the 'official' object name, not the user-provided
-
-        # if just single object,
-        if idx is None and name is None:
-            if self.N_candidates == 1:
-                ned_objname = self._candidates[0][1][0]
-            else:
-                raise RuntimeError('Target not uniquely identified' \
-                        ' in the candidate list.')
-
-        # if we have a valid index, use it.
-        if isinstance(idx, int):
-            ned_objname = self._candidates[idx][1][0]
-        else: # try to indentify by name
-            for cad_i in self._candidates:
-                if cad_i[1][0] == name: # exact match
-                    if N_phot is None: # FIXME: why N_phot?
-                        ned_objname = self._candidates[idx][1][0]
-                    else:
-                        raise IdentificationError(\
-                                'More than one candidate matched by name')
-            if ned_objname is None:
-                raise IdentificationError( \
-                    'No candidate is matched by this name.')
+        # the 'official' object name, not the user-provided
+        idx, ned_objname = self._resolve_candidate(idx=idx, name=name)
+        if idx in self._class_cache: # a copy, callers may edit the result
+            return {k: list(v) for k, v in self._class_cache[idx].items()}
 
         # construct query url
         req_url = self.ned_mirror_url + \
                 '/cgi-bin/NEDatt?objname=' + ps.quote(ned_objname)
-        req = requests.get(req_url)
+        req = self._session.get(req_url, timeout=self.req_timeout)
 
         # get classification result table
-        soup_i = BeautifulSoup(req.text, "html5lib")
+        soup_i = BeautifulSoup(req.content, "lxml",
+                parse_only=_CLASS_TABLE_STRAINER)
         cl_elm = soup_i.find_all('table',
                 attrs={'summary': 'Classification Results'})[0]
         cl_rows = cl_elm.find_all('tr')
@@ -642,7 +673,35 @@ class NedSpider:
                 if sec_i != '':
                     cl_results[sec_i].append(tuple(cells_i))
 
-        return cl_results
+        self._class_cache[idx] = cl_results
+        return {k: list(v) for k, v in cl_results.items()}
+
+    def fetch_all(self, methods=('alias', 'photometry', 'classification'),
+                  max_workers=8):
+
+        '''
+            Run detail queries of all candidates concurrently, over the
+            shared session. returns a list (one per candidate) of dict of
+            method name -> result. 'max_workers' is capped at the size of
+            the connection pool (_pool_maxsize).
+        '''
+
+        # no more threads than pooled connections, or urllib3 discards them
+        max_workers = min(max_workers, self._pool_maxsize)
+
+        # one task per (candidate, method), network waits overlap in threads
+        tasks = [(i_cd, mtd_i) for i_cd in range(self.N_candidates) \
+                for mtd_i in methods]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(getattr(self, mtd_i), idx=i_cd) \
+                    for i_cd, mtd_i in tasks]
+
+        # collect results, exceptions of any query are raised here.
+        results = [{} for i_cd in range(self.N_candidates)]
+        for (i_cd, mtd_i), fut_i in zip(tasks, futures):
+            results[i_cd][mtd_i] = fut_i.result()
+
+        return results
 
     def image(self, idx=None, name=None):
 
@@ -653,45 +712,22 @@ class NedSpider:
             Get the list of archival images
         '''
 
-        if idx is None and name is None:
-            if self.N_candidates == 1:
-                image_link = self._candidates[0][17][1]
-            else:
-                raise RuntimeError('Object not uniquely ' + \
-                        'identified in the candidate list.')
-
-        # if we have a valid index, use it.
-        image_link = None, None
-        if isinstance(idx, int):
-            image_link = self._candidates[idx][17][1]
-        else: # try to indentify by name
-            for cad_i in self._candidates:
-                if cad_i[1][0] == name: # exact match
-                    if image_link is None:
-                        image_link = cad_i[17][1]
-                    else:
-                        raise IdentificationError(\
-                                'More than one candidate matched by name')
-            if image_link is None:
-                raise IdentificationError('No photometry information is ' \
-                        'matched by this name.')
+        # which candidate? then the link of its image list
+        idx, name = self._resolve_candidate(idx=idx, name=name)
+        image_link = self._candidates[idx][17][1]
 
         # modify the link
         req_url = ps.urlsplit(self.ned_mirror_url + image_link) # in namedtuple
         query_par = dict(ps.parse_qsl(req_url.query)) # parse query str
-
-        # apply our cosmological seetings
-        query_par['hconst'] = str(self._hconst)
-        query_par['omegam'] = str(self._omegam)
-        query_par['omegav'] = str(self._omegav)
-        query_par['corr_z'] = str(self._corr_z)
+        query_par.update(self._cosmo_params) # apply our cosmological seetings
 
         # combine into url and send request
         req_url = req_url._replace(query=ps.urlencode(query_par))
-        req = requests.get(ps.urlunsplit(req_url), timeout=self.req_timeout)
+        req = self._session.get(ps.urlunsplit(req_url),
+                timeout=self.req_timeout)
 
         # parse and analyze the table
-        soup_i = BeautifulSoup(req.text, 'html5lib')
+        soup_i = BeautifulSoup(req.content, 'lxml')
 
         # TODO: convert HTML table to some organized tabular format.
         # see: NOTE180111A
@@ -703,44 +739,22 @@ class NedSpider:
             TODO: doc.
         '''
 
-        ned_objname = None # NED primary object name
-
-        # if just single object,
-        if idx is None and name is None:
-            if self.N_candidates == 1:
-                ned_objname = self._candidates[0][1][0]
-            else:
-                raise RuntimeError('Target not uniquely identified' \
-                        ' in the candidate list.')
-
-        # if we have a valid index, use it.
-        if isinstance(idx, int):
-            ned_objname = self._candidates[idx][1][0]
-        else: # try to indentify by name
-            for cad_i in self._candidates:
-                if cad_i[1][0] == name: # exact match
-                    if N_phot is None: # FIXME: N_phot
-                        ned_objname = self._candidates[idx][1][0]
-                    else:
-                        raise IdentificationError(\
-                                'More than one candidate matched by name')
-            if ned_objname is None:
-                raise IdentificationError( \
-                        'No candidate is matched by this name.')
+        # NED primary object name
+        idx, ned_objname = self._resolve_candidate(idx=idx, name=name)
 
         # construct query url
         req_url = self.ned_mirror_url + \
                 '/cgi-bin/nDistance?name=' + ps.quote(ned_objname)
         try:
-            req = requests.get(req_url)
+            req = self._session.get(req_url, timeout=self.req_timeout)
         except Exception as e: # exc handling
             raise
 
         # parse the page
-        soup_i = BeautifulSoup(req.text, 'html5lib')
+        soup_i = BeautifulSoup(req.content, 'lxml')
 
         # find number of redshift-independent distance
-        dist_count_str = soup_i(text=re.compile(r'Distances found in NED'))[0]
+        dist_count_str = soup_i(text=_RE_DIST_COUNT)[0]
         N_dist = int(dist_count_str.split(' ')[0])
 
         # if nothing was found, return nothing.
@@ -751,10 +765,9 @@ class NedSpider:
         result = {}
 
         # have computed summary statistics
-        summ_stat_elm = soup_i(text=re.compile(r'Computed Summary Statistics'))
+        summ_stat_elm = soup_i(text=_RE_SUMM_STAT)
         if len(summ_stat_elm):
-            stat_tab_elm = soup_i(text=re.compile( \
-                    r'Distance Modulus'))[0].parent.parent.parent
+            stat_tab_elm = soup_i(text=_RE_DISTMOD)[0].parent.parent.parent
             stat_tab_rows = stat_tab_elm.find_all('tr')
             result['sumstats'] = {'distmod': {}, 'dist': {}}
             for row_i in stat_tab_rows:
@@ -766,10 +779,9 @@ class NedSpider:
                 result['sumstats']['dist'][rlab_i] = float(cols_i[2].text)
 
         # parse individual measurements.
-        indi_elm = soup_i(text=re.compile(r'Individually Referenced'))
+        indi_elm = soup_i(text=_RE_INDIVIDUAL)
         if len(indi_elm): # has individual measurements
-            indi_tab_elm = soup_i( \
-                    text=re.compile(r'(m-M)'))[0].parent.parent.parent
+            indi_tab_elm = soup_i(text=_RE_MM)[0].parent.parent.parent
             indi_tab_rows = indi_tab_elm.find_all('tr')
             coln_i = [w.get_text() for w in indi_tab_rows[0].find_all('th')]
             result['individual'] = []
@@ -778,4 +790,4 @@ class NedSpider:
                 result['individual'].append({coln_j: colv_j \
                         for coln_j, colv_j in zip(coln_i, cols_i)})
 
-        return results
+        return result